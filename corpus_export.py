@@ -0,0 +1,170 @@
+"""
+
+Columnar corpus export
+
+Converts the pickled result lists in data/{source}_{date}.pkl, and those of
+batch jobs in data/{job}/{source}_{date}.pkl, into Parquet files partitioned by
+source and month:
+
+    export/source={source}/month={YYYY-MM}/part-{date}.parquet
+    export/source={source}/month={YYYY-MM}/raw-{date}.parquet
+
+Days of a job are written as part-{job}-{date}.parquet and raw-{job}-{date}.parquet
+so that jobs covering the same source and day do not overwrite each other.
+
+The part files hold the metadata and text of every article, the raw files hold
+the url and raw page only, so loading metadata never touches the raw HTML.
+Every pickle maps to its own part file; exporting again only writes the days
+that have not been exported yet, and rewrites the part and raw files of days
+whose pickle changed since (e.g. by refresh_by_day). Other partitions are never
+rewritten.
+
+"""
+import optparse
+import logging
+import glob
+import json
+import os
+import pickle
+import tqdm
+import pyarrow as pa
+import pyarrow.parquet as pq
+import records
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level="INFO")
+
+DATA_DIR   = 'data'
+EXPORT_DIR = 'export'
+VERBOSE    = True
+
+FIELDS      = ['url', 'source', 'byline', 'firstline', 'secondline', 'date', 'hits', 'excerpt', 'body']
+LIST_FIELDS = ['matched_terms', 'shards']
+RAW_FIELD   = 'raw'
+
+SCHEMA = pa.schema([pa.field(f, pa.string()) for f in FIELDS] +
+                   [pa.field(f, pa.list_(pa.string())) for f in LIST_FIELDS] +
+                   [pa.field(f, pa.string()) for f in ('caps', 'scraped_source', 'scraped_date')])
+RAW_SCHEMA = pa.schema([pa.field('url', pa.string()), pa.field(RAW_FIELD, pa.string())])
+
+def _parse_filename(path):
+    ''' returns (source, date) from a data/{source}_{date}.pkl path '''
+    stem         = os.path.basename(path)[:-len('.pkl')]
+    source, date = stem.rsplit('_', 1)
+    return source, date
+
+def _safe(name):
+    return name.replace(os.sep, '-')
+
+def partition_dir(export_dir, source, date):
+    month = date[:7]
+    return os.path.join(export_dir, 'source={}'.format(_safe(source)), 'month={}'.format(month))
+
+def _caps(result):
+    ''' caps fields are the keys collected by _get_caps, they end on a colon '''
+    return {k: result[k] for k in result.keys() if k.endswith(':')}
+
+def _string(value):
+    return None if value is None else str(value)
+
+def to_tables(results, scraped_source, scraped_date, data_dir=DATA_DIR):
+    '''
+    Converts a list of result dicts into a metadata table and a raw table,
+    reading raw pages from the raw files in data_dir. Caps fields are stored
+    as a JSON object in the caps column, missing fields as null.
+    '''
+    columns = {field: [_string(r.get(field)) for r in results] for field in FIELDS}
+    for field in LIST_FIELDS:
+        columns[field] = [list(r.get(field, [])) for r in results]
+    columns['caps']           = [json.dumps(_caps(r), ensure_ascii=False) for r in results]
+    columns['scraped_source'] = [scraped_source] * len(results)
+    columns['scraped_date']   = [scraped_date] * len(results)
+
+    # read the handles of Articles directly, so every raw file is opened once
+    raws = [r.raw if isinstance(r, records.Article) else r.get(RAW_FIELD) for r in results]
+    raw  = {'url': columns['url'], RAW_FIELD: records.load_raws(raws, data_dir)}
+
+    return pa.Table.from_pydict(columns, schema=SCHEMA), pa.Table.from_pydict(raw, schema=RAW_SCHEMA)
+
+def _pickles(data_dir):
+    ''' all pickles in data_dir and its job directories '''
+    return sorted(glob.glob(os.path.join(data_dir, '**', '*.pkl'), recursive=True))
+
+def export_file(path, export_dir=EXPORT_DIR, data_dir=DATA_DIR):
+    '''
+    Exports a single pickle to its partition. Returns False if the file was
+    already exported and has not changed since, or holds no results.
+    '''
+    source, date = _parse_filename(path)
+    job          = os.path.dirname(os.path.relpath(path, data_dir))
+    name         = '{}-{}'.format(_safe(job), date) if job else date
+    directory    = partition_dir(export_dir, source, date)
+    partfile     = os.path.join(directory, 'part-{}.parquet'.format(name))
+    rawfile      = os.path.join(directory, 'raw-{}.parquet'.format(name))
+    if os.path.exists(partfile) and os.path.getmtime(partfile) >= os.path.getmtime(path):
+        return False
+
+    results = pickle.load(open(path, 'rb'))
+    if not isinstance(results, list) or not results:
+        logger.debug("No results in {path}, skipping".format(**locals()))
+        return False
+
+    table, raw = to_tables(results, source, date, data_dir)
+    os.makedirs(directory, exist_ok=True)
+    # raw goes first so that an interrupted export is redone on the next run
+    pq.write_table(raw, rawfile)
+    pq.write_table(table, partfile)
+    return True
+
+def export_corpus(data_dir=DATA_DIR, export_dir=EXPORT_DIR):
+    ''' appends all pickles in data_dir that have not been exported yet '''
+    paths    = _pickles(data_dir)
+    exported = 0
+    for path in tqdm.tqdm(paths, disable=not VERBOSE, desc="exporting"):
+        exported += export_file(path, export_dir, data_dir)
+    logger.info("Exported {exported} of {n} files to {export_dir}".format(n=len(paths), **locals()))
+    return exported
+
+def _partfiles(export_dir, prefix, sources=None, months=None):
+    paths = glob.glob(os.path.join(export_dir, 'source=*', 'month=*', '{}-*.parquet'.format(prefix)))
+    for path in sorted(paths):
+        monthdir  = os.path.dirname(path)
+        month     = os.path.basename(monthdir)[len('month='):]
+        source    = os.path.basename(os.path.dirname(monthdir))[len('source='):]
+        if sources and source not in [_safe(s) for s in sources]: continue
+        if months and month not in months: continue
+        yield path
+
+def load_metadata(export_dir=EXPORT_DIR, sources=None, months=None, columns=None):
+    '''
+    Loads the metadata of the exported corpus as a pyarrow Table, optionally
+    limited to some sources, months (as 'YYYY-MM') and columns.
+    '''
+    tables = [pq.read_table(path, columns=columns) for path in _partfiles(export_dir, 'part', sources, months)]
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+def load_raw(urls, export_dir=EXPORT_DIR, sources=None, months=None):
+    ''' returns a {url: raw} dict for the given urls '''
+    urls = set(urls)
+    raw  = {}
+    for path in _partfiles(export_dir, 'raw', sources, months):
+        table = pq.read_table(path).to_pydict()
+        for url, page in zip(table['url'], table[RAW_FIELD]):
+            if url in urls: raw[url] = page
+    return raw
+
+def start_export():
+
+    usage = "corpus_export.py [OPTIONS]"
+    parser = optparse.OptionParser(usage=usage)
+
+    parser.add_option('-i','--input',  action='store', dest='data_dir',   help='directory with the scraped pickles', default=DATA_DIR)
+    parser.add_option('-o','--output', action='store', dest='export_dir', help='directory to write the partitioned corpus to', default=EXPORT_DIR)
+
+    options, _ = parser.parse_args()
+    export_corpus(options.data_dir, options.export_dir)
+
+if __name__ == '__main__':
+    start_export()
@@ -0,0 +1,174 @@
+"""
+
+Local full-text index over the scraped corpus
+
+Keeps an SQLite FTS5 index over the byline, excerpt, body and caps fields of the
+articles in data/{source}_{date}.pkl and data/{job}/{source}_{date}.pkl, so
+questions like "which articles mention this term" can be answered offline
+instead of searching Lexis Nexis again.
+Updating the index only reads the pickles that are new or changed since they
+were indexed (e.g. by refresh_by_day).
+
+Queries use the Lexis Nexis syntax of german_political_query.txt: quoted
+phrases, OR, AND, AND NOT, parentheses and ! or * for truncation. As in Lexis
+Nexis, OR binds tighter than AND, which binds tighter than AND NOT.
+
+"""
+import optparse
+import logging
+import glob
+import os
+import pickle
+import sqlite3
+import tqdm
+import query_planner
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level="INFO")
+
+DATA_DIR   = 'data'
+INDEXFILE  = 'index.sqlite'
+VERBOSE    = True
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS indexed_pickles (path TEXT PRIMARY KEY, mtime REAL, size INTEGER);
+CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, article INTEGER);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5(
+    url UNINDEXED, source UNINDEXED, date UNINDEXED, byline, excerpt, body, caps
+);
+'''
+
+def connect(indexfile=INDEXFILE):
+    connection = sqlite3.connect(indexfile)
+    connection.executescript(SCHEMA)
+    return connection
+
+def _caps_text(result):
+    ''' caps fields are the keys collected by _get_caps, they end on a colon '''
+    return '\n'.join('{} {}'.format(k, result[k]) for k in result.keys() if k.endswith(':'))
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+def index_file(connection, path, data_dir=DATA_DIR):
+    '''
+    Adds the articles of a single pickle to the index, skipping urls that are
+    already indexed. Returns the number of articles added.
+    '''
+    results = pickle.load(open(path, 'rb'))
+    if not isinstance(results, list):
+        logger.warning("No results in {path}, skipping".format(**locals()))
+        results = []
+
+    added = 0
+    for result in results:
+        if not connection.execute('INSERT OR IGNORE INTO urls (url) VALUES (?)', (result['url'],)).rowcount:
+            continue
+        article = connection.execute('INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)', (
+            result['url'], result.get('source', ''), result.get('date', ''), result.get('byline', ''),
+            result.get('excerpt', ''), result.get('body', ''), _caps_text(result))).lastrowid
+        connection.execute('UPDATE urls SET article = ? WHERE url = ?', (article, result['url']))
+        added += 1
+    connection.execute('INSERT OR REPLACE INTO indexed_pickles VALUES (?, ?, ?)',
+                       (os.path.relpath(path, data_dir),) + _stat(path))
+    return added
+
+def update_index(connection, data_dir=DATA_DIR):
+    ''' indexes all pickles in data_dir that are new or changed since they were indexed '''
+    indexed = {row[0]: tuple(row[1:]) for row in connection.execute('SELECT path, mtime, size FROM indexed_pickles')}
+    paths   = [p for p in sorted(glob.glob(os.path.join(data_dir, '**', '*.pkl'), recursive=True))
+               if indexed.get(os.path.relpath(p, data_dir)) != _stat(p)]
+
+    added = 0
+    for path in tqdm.tqdm(paths, disable=not VERBOSE, desc="indexing"):
+        added += index_file(connection, path, data_dir)
+        connection.commit()
+    logger.info("Indexed {added} articles from {n} new or changed files".format(n=len(paths), **locals()))
+    return added
+
+def _phrase(words):
+    prefix = words[-1].endswith('!') or words[-1].endswith('*')
+    phrase = ' '.join(w.strip('"') for w in words).rstrip('!*')
+    return '"{}"'.format(phrase.replace('"', '""')) + (' *' if prefix else '')
+
+def _fts(node):
+    operator, operands = node
+    if operator == query_planner.PHRASE:
+        return _phrase(operands)
+    nodes = [_fts(operand) for operand in operands]
+    if operator == 'AND NOT':
+        # FTS5 NOT is binary, so a chain becomes ((a NOT b) NOT c)
+        fts = nodes[0]
+        for right in nodes[1:]:
+            fts = '({} NOT {})'.format(fts, right)
+        return fts
+    if query_planner.is_proximity(operator):
+        logger.warning("Proximity operator {operator} is not supported, using AND".format(**locals()))
+        operator = 'AND'
+    return '(' + ' {} '.format(operator).join(nodes) + ')'
+
+def to_fts(query):
+    '''
+    Translates a Lexis Nexis query into a fully parenthesised FTS5 query, e.g.
+    'CDU OR SPD AND merkel! AND NOT "Die PARTEI"' becomes
+    '((("CDU" OR "SPD") AND "merkel" *) NOT "Die PARTEI")'.
+
+    The query is parsed by query_planner.parse. Proximity operators (w/n,
+    pre/n) are searched as AND. Raises ValueError for queries that cannot be
+    parsed.
+    '''
+    return _fts(query_planner.parse(query))
+
+def search(connection, query, sources=None, limit=None):
+    '''
+    Returns (url, source, date, byline) tuples of the articles matching a Lexis
+    Nexis query, best matches first.
+    '''
+    sql    = 'SELECT url, source, date, byline FROM articles WHERE articles MATCH ?'
+    params = [to_fts(query)]
+    if sources:
+        sql += ' AND source IN ({})'.format(', '.join('?' * len(sources)))
+        params.extend(sources)
+    sql += ' ORDER BY rank'
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(int(limit))
+    return connection.execute(sql, params).fetchall()
+
+def start_index():
+
+    usage = "corpus_index.py [OPTIONS] QUERY"
+    parser = optparse.OptionParser(usage=usage)
+
+    parser.add_option('-i','--index',   action='store', dest='indexfile', help='sqlite file holding the index', default=INDEXFILE)
+    parser.add_option('-d','--data',    action='store', dest='data_dir',  help='directory with the scraped pickles', default=DATA_DIR)
+    parser.add_option('-u','--update',  action='store_true', dest='update', help='index new pickles before searching')
+    parser.add_option('-f','--queryfile', action='store', dest='queryfile', help='file containing the query, e.g. german_political_query.txt')
+    parser.add_option('-s','--sources', action='store', dest='sources',
+                        help='semi-colon seperated sources, e.g. "Die Welt; Der Spiegel"')
+    parser.add_option('-l','--limit',   action='store', dest='limit', help='maximum number of articles to print')
+
+    options, queryterms = parser.parse_args()
+
+    connection = connect(options.indexfile)
+    if options.update:
+        update_index(connection, options.data_dir)
+
+    query = ' '.join(queryterms)
+    if options.queryfile:
+        query = open(options.queryfile).read().strip()
+    if not query:
+        return
+
+    sources = options.sources and [s.strip() for s in options.sources.split(';')]
+    try:
+        articles = search(connection, query, sources, options.limit)
+    except (ValueError, sqlite3.OperationalError) as e:
+        print("Invalid query '{query}': {e}".format(**locals()))
+        return
+    for url, source, date, byline in articles:
+        print('\t'.join([date, source, byline.replace('\n', ' '), url]))
+
+if __name__ == '__main__':
+    start_index()
@@ -11,14 +11,19 @@ import optparse
 import logging
 import time
 import random
+import re
 from selenium import webdriver
 import platform
 import tqdm
 import datetime
 from lxml.html import fromstring
 import os
+import glob
 import pickle
+import json
 from selenium.webdriver.common.keys import Keys
+import query_planner
+import records
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level="INFO")
@@ -28,6 +33,9 @@ TIMEOUT_SEC    = 2
 TIMEOUT_JITTER = 1
 VERBOSE        = True
 STATUSFILE     = 'status.pkl'
+HITSFILE       = 'hits.pkl'
+RAWFILE        = os.path.join('data', 'raw.dat')
+MAX_HITS       = 3000
 
 def retry(attempts, func, *args, **kwargs):
     for i in range(attempts):
@@ -67,7 +75,7 @@ def _make_driver(driver='Firefox', **kwargs):
 def _toframe(driver,xpath):
     driver.switch_to_frame(driver.find_element_by_xpath(xpath))
 
-def main(driver, country=None, source=None, fromdate=None, todate=None, query="a"):
+def main(driver, country=None, source=None, fromdate=None, todate=None, query="a", max_hits=None):
 
     if not todate:
         todate = datetime.datetime.now()
@@ -75,6 +83,10 @@ def main(driver, country=None, source=None, fromdate=None, todate=None, query="a
     if not fromdate:
         fromdate = todate - datetime.timedelta(days=1)
 
+    if country and source:
+        driver, results, hitcounts, _ = search_source(driver, country, source, fromdate, todate, query, max_hits)
+        return results, hitcounts
+
     driver = initialize_sources_page(driver)
     
     if not country:
@@ -86,22 +98,82 @@ def main(driver, country=None, source=None, fromdate=None, todate=None, query="a
         sources           = scan_pages_for_sources(driver)
         return sources
      
-    if country and source:
-        driver, _ = get_countries(driver, country)
-        pages     = get_pages(driver)
+    raise Exception("Unknown parameters country={country}, source={source}".format(**locals()))
 
-        driver          = go_and_select_source(driver, source)
-        driver          = push_go(driver)
-        driver.switch_to_default_content()
-        driver, results = search(driver, fromdate, todate, query)
+def open_search_form(driver, country, source, initialize=False):
+    ''' selects source in country and continues to the search form '''
+    if initialize:
+        driver = initialize_sources_page(driver)
+    driver, _ = get_countries(driver, country)
+    pages     = get_pages(driver)
 
-        return results
-    return "Unknown parameters"
+    driver    = go_and_select_source(driver, source)
+    driver    = push_go(driver)
+    driver.switch_to_default_content()
+    return driver
+
+def go_to_search_form(driver, country, source, selected=None):
+    '''
+    Brings the driver to the search form of source in country. selected is
+    the (country, source) of the results page the driver is on, if any: the
+    same source goes back through "Edit Search", another source in the same
+    country is reselected without reloading the site and picking the country
+    again. Anything else starts from a freshly initialized sources page.
+    Returns the driver and the new selection.
+    '''
+    if selected == (country, source) and back_to_search_form(driver):
+        return driver, selected
+    if selected and selected[0] == country and reselect_source(driver, source):
+        return driver, (country, source)
+    driver = open_search_form(driver, country, source, initialize=True)
+    return driver, (country, source)
+
+def search_sharded(driver, country, source, fromdate, todate, query, max_hits=MAX_HITS, selected=None):
+    '''
+    Splits an OR-query into shards that stay under max_hits, searches every
+    shard and merges the results. Probes and searches after the first go back
+    to the search form of the same source, see go_to_search_form. Returns the
+    driver, the results and the hit count of every shard query.
+    '''
+    def probe(shard_query):
+        nonlocal selected
+        _, selected = go_to_search_form(driver, country, source, selected)
+        return probe_hits(driver, fromdate, todate, shard_query)
+
+    terms  = query_planner.parse_query(query)
+    if len(terms) == 1:
+        logger.warning("The top-level operator of {query} is not OR, searching it as a single shard".format(**locals()))
+    shards = query_planner.plan_shards(terms, probe, max_hits)
+    logger.info("Searching {source} in {n} shards".format(n=len(shards), **locals()))
+
+    shard_results = []
+    hitcounts     = {}
+    for shard, hits in shards:
+        shard_query               = query_planner.join_terms(shard)
+        driver, selected          = go_to_search_form(driver, country, source, selected)
+        driver, results, hitcount = search(driver, fromdate, todate, shard_query)
+        shard_results.append((shard, results))
+        hitcounts[shard_query]    = hitcount
+    return driver, query_planner.merge_shard_results(shard_results), hitcounts
+
+def search_source(driver, country, source, fromdate, todate, query, max_hits=None, selected=None):
+    '''
+    Searches query in source, in shards when max_hits is given, starting from
+    the page of selected (see go_to_search_form). Returns the driver, the
+    results, the hit count of every query searched and the new selection.
+    '''
+    if max_hits:
+        driver, results, hitcounts = search_sharded(driver, country, source, fromdate, todate, query, max_hits, selected)
+    else:
+        driver, selected          = go_to_search_form(driver, country, source, selected)
+        driver, results, hitcount = search(driver, fromdate, todate, query)
+        hitcounts                 = {query: hitcount}
+    return driver, results, hitcounts, (country, source)
 
 def _querystring(country,sources):
     return "{country}-{sources}".format(**locals())
 
-def search_back_by_day( country, sources, startdate=None, enddate=datetime.datetime(1,1,1,1), query="a"):
+def search_back_by_day( country, sources, startdate=None, enddate=datetime.datetime(1,1,1,1), query="a", max_hits=None):
     if not 'data' in os.listdir('.'):
         os.mkdir('data')
 
@@ -111,10 +183,13 @@ def search_back_by_day( country, sources, startdate=None, enddate=datetime.datet
     else:
         status = {}
 
+    hitstore = _load_hits()
+
     if not startdate: 
         startdate = datetime.datetime.now()
 
-    driver = _make_driver()
+    driver   = _make_driver()
+    selected = None
     logger.info("starting at {startdate}".format(**locals()))
 
     while startdate > enddate:
@@ -122,12 +197,102 @@ def search_back_by_day( country, sources, startdate=None, enddate=datetime.datet
         for source in tqdm.tqdm(sources, disable=not VERBOSE, desc="getting %s" %startdate):
             resultfile = '{source}_{startdate}.pkl'.format(**locals())
             if resultfile in os.listdir('data'): continue
-            results = main(driver, country, source, todate=startdate, query=query)
-            pickle.dump(results, open(os.path.join('data',resultfile) ,'wb'))
+            fromdate = startdate - datetime.timedelta(days=1)
+            driver, results, hitcounts, selected = search_source(driver, country, source, fromdate, startdate,
+                                                                 query, max_hits, selected)
+            _store_results(hitstore, country, query, source, startdate, resultfile, results, hitcounts, bool(max_hits))
         startdate = startdate - datetime.timedelta(days=1)
         status[_querystring(country,sources)] = startdate
         pickle.dump(status, open(STATUSFILE,'wb'))
     driver.quit()
+
+def _store_results(hitstore, country, query, source, todate, resultfile, results, hitcounts, sharded):
+    ''' writes results to data/resultfile and records their hit counts '''
+    pickle.dump(results, open(os.path.join('data',resultfile) ,'wb'))
+    hitstore[(country, query, source, todate)] = dict(fromdate   = todate - datetime.timedelta(days=1),
+                                                      hitcounts  = hitcounts,
+                                                      resultfile = resultfile,
+                                                      sharded    = sharded)
+    pickle.dump(hitstore, open(HITSFILE,'wb'))
+
+def _load_hits():
+    ''' hit counts per (country, query, source, todate) of every stored search window '''
+    if HITSFILE in os.listdir('.'):
+        return pickle.load(open(HITSFILE,'rb'))
+    return {}
+
+def refresh_by_day(country, sources, query="a", startdate=None, enddate=datetime.datetime(1,1,1,1), max_hits=MAX_HITS):
+    '''
+    Re-probes the hit count of every stored search window of query in sources
+    and only fetches windows whose counts changed. Within those windows, only
+    the results whose urls are not stored or fetched by an earlier shard yet
+    are opened, and the new results are appended to the stored result file.
+    A shard whose count grew over max_hits is planned into new shards.
+    '''
+    hitstore = _load_hits()
+    windows  = sorted(key for key in hitstore if key[:2] == (country, query) and key[2] in sources
+                      and key[3] > enddate and (not startdate or key[3] <= startdate))
+    logger.info("Refreshing {n} stored windows".format(n=len(windows)))
+
+    recorded   = {entry['resultfile'] for entry in hitstore.values()}
+    unrecorded = [path for source in sources
+                  for path in glob.glob(os.path.join('data', '**', glob.escape(source) + '_*.pkl'), recursive=True)
+                  if os.path.relpath(path, 'data') not in recorded]
+    if unrecorded:
+        logger.warning("{n} stored result files of these sources have no recorded hit counts and are not refreshed".format(n=len(unrecorded)))
+
+    driver   = _make_driver()
+    selected = None
+    for key in tqdm.tqdm(windows, disable=not VERBOSE, desc="refreshing"):
+        _, _, source, todate = key
+        entry    = hitstore[key]
+        path     = os.path.join('data', entry['resultfile'])
+        if not os.path.exists(path): continue
+        stored   = pickle.load(open(path,'rb'))
+        known    = {r['url'] for r in stored}
+        fetched  = set(known)
+
+        def probe(shard_query):
+            nonlocal driver, selected
+            driver, selected = go_to_search_form(driver, country, source, selected)
+            return probe_hits(driver, entry['fromdate'], todate, shard_query)
+
+        def fetch(shard_query, hits):
+            ''' pages through the results of the query probed last '''
+            nonlocal driver
+            driver, results = paginate_search(driver, fetched)
+            fetched.update(r['url'] for r in results)
+            terms = query_planner.parse_query(shard_query) if entry['sharded'] else [shard_query]
+            shard_results.append((terms, results))
+            entry['hitcounts'][shard_query] = hits
+
+        shard_results = []
+        for shard_query, hitcount in list(entry['hitcounts'].items()):
+            hits = probe(shard_query)
+            if hits is None or hits == hitcount: continue
+            logger.info("{source} {todate}: {hitcount} -> {hits} hits for {shard_query}".format(**locals()))
+            if hits > max_hits and entry['sharded']:
+                logger.warning("{source} {todate}: {hits} hits for {shard_query} are over the cap of {max_hits}, splitting it".format(**locals()))
+                del entry['hitcounts'][shard_query]
+                terms = query_planner.parse_query(shard_query)
+                for shard, _ in query_planner.plan_shards(terms, probe, max_hits):
+                    shard_query = query_planner.join_terms(shard)
+                    fetch(shard_query, probe(shard_query))
+                continue
+            if hits > max_hits:
+                logger.warning("{source} {todate}: {hits} hits for {shard_query} are over the cap of {max_hits}, results are cut off".format(**locals()))
+            fetch(shard_query, hits)
+
+        if not shard_results: continue
+        if entry['sharded']:
+            new = query_planner.merge_shard_results(shard_results)
+        else:
+            new = [r for _, results in shard_results for r in results]
+        new = [r for r in new if r['url'] not in known]
+        logger.info("{source} {todate}: adding {n} results".format(n=len(new), **locals()))
+        pickle.dump(stored + new, open(path,'wb'))
+        pickle.dump(hitstore, open(HITSFILE,'wb'))
+    driver.quit()
     
 
 def initialize_sources_page(driver):    
@@ -203,14 +368,164 @@ def push_go(driver):
     go_button.click()
     return driver
 
-def search(driver, fromdate, todate, query):
+def load_jobs(jobfile):
+    '''
+    Reads a JSON job file: a list of jobs, each with a country, a list of
+    sources, a query (or a queryfile), a from and to date as YYYY-MM-DD and
+    optionally a name and max_hits. e.g.:
+
+    [{"name": "welt", "country": "Germany", "sources": ["Die Welt"],
+      "queryfile": "german_political_query.txt", "from": "2017-01-01", "to": "2017-02-01"}]
+    '''
+    jobs = json.load(open(jobfile))
+    for n, job in enumerate(jobs):
+        job.setdefault('name', 'job{n}'.format(**locals()))
+        job.setdefault('max_hits', None)
+        if 'queryfile' in job:
+            job['query'] = open(job['queryfile']).read().strip()
+        job['fromdate'] = datetime.datetime.strptime(job['from'], '%Y-%m-%d')
+        job['todate']   = datetime.datetime.strptime(job['to'],   '%Y-%m-%d')
+    return jobs
+
+def _source_page(source):
+    ''' the alphabetical sources page go_and_select_source looks under first '''
+    let = source.split()[0].capitalize()[0]
+    return let if let.isalpha() else "0-9"
+
+def schedule_tasks(jobs):
+    '''
+    Splits jobs into one task per source and day, ordered by country,
+    alphabetical sources page and source so that consecutive tasks can reuse
+    the selected country and source (see go_to_search_form). Within a source,
+    days go from new to old.
+    '''
+    tasks = []
+    for job in jobs:
+        todate = job['todate']
+        while todate > job['fromdate']:
+            for source in job['sources']:
+                tasks.append(dict(job=job['name'], country=job['country'], source=source,
+                                  query=job['query'], max_hits=job['max_hits'], todate=todate))
+            todate = todate - datetime.timedelta(days=1)
+
+    tasks.sort(key=lambda t: t['todate'], reverse=True)
+    tasks.sort(key=lambda t: (t['country'], _source_page(t['source']), t['source'], t['query']))
+    return tasks
+
+def run_jobs(jobs):
+    '''
+    Runs the tasks of all jobs in scheduled order. Results of a job go to
+    data/{name}/{source}_{date}.pkl; tasks with an existing result file are
+    skipped so an interrupted batch can be restarted. A task that fails, e.g.
+    because Lexis Nexis does not accept its query, is recorded in the progress
+    of its job and the batch continues; it is tried again on the next run.
+    Returns the progress of every job.
+    '''
+    hitstore = _load_hits()
+    tasks    = schedule_tasks(jobs)
+    progress = {job['name']: dict(done=0, skipped=0, failed=[], total=sum(1 for t in tasks if t['job'] == job['name']))
+                for job in jobs}
+    for job in jobs:
+        os.makedirs(os.path.join('data', job['name']), exist_ok=True)
+
+    driver   = _make_driver()
+    selected = None
+    for task in tqdm.tqdm(tasks, disable=not VERBOSE, desc="running jobs"):
+        job, source, todate = task['job'], task['source'], task['todate']
+        resultfile = os.path.join(job, '{source}_{todate}.pkl'.format(**locals()))
+        if os.path.exists(os.path.join('data', resultfile)):
+            progress[job]['skipped'] += 1
+            continue
+
+        fromdate = todate - datetime.timedelta(days=1)
+        try:
+            driver, results, hitcounts, selected = search_source(driver, task['country'], source, fromdate, todate,
+                                                                 task['query'], task['max_hits'], selected)
+        except Exception as e:
+            logger.error("{job}: {source} {todate} failed: {e}".format(**locals()))
+            progress[job]['failed'].append((source, todate))
+            selected = None
+            continue
+
+        _store_results(hitstore, task['country'], task['query'], source, todate, resultfile, results, hitcounts, bool(task['max_hits']))
+        progress[job]['done'] += 1
+        logger.info("{job}: {done}/{total} tasks done".format(job=job, **progress[job]))
+    driver.quit()
+
+    for job, counts in progress.items():
+        for source, todate in counts['failed']:
+            logger.warning("{job}: {source} {todate} failed, run the job file again to retry".format(**locals()))
+    return progress
+
+def back_to_search_form(driver):
+    '''
+    Returns from a results page to the search form with the current source
+    still selected. Returns False if there is no way back.
+    '''
+    driver = _focus_search_main(driver)
+    link   = retry(3, driver.find_element_by_link_text, "Edit Search")
+    if link == "FAILED" or not link:
+        return False
+    link.click()
+    driver.switch_to_default_content()
+    return True
+
+def reselect_source(driver, source):
+    '''
+    Goes from a results page back to the sources page, where the country is
+    still selected, and selects another source. Returns False if there is no
+    link to the sources page.
+    '''
+    driver = _focus_search_main(driver)
+    link   = retry(3, driver.find_element_by_link_text, "Sources")
+    if link == "FAILED" or not link:
+        return False
+    link.click()
+    time.sleep(5)
+    driver = go_and_select_source(driver, source)
+    driver = push_go(driver)
+    driver.switch_to_default_content()
+    return True
+
+def search(driver, fromdate, todate, query, known_urls=()):
+    '''
+    Searches and fetches all results. The returned hit count is None when it
+    could not be read from the results page.
+    '''
+    if not _submit_search(driver, fromdate, todate, query):
+        raise Exception("Search terms not accepted :-(")
+    hitcount        = get_hitcount(driver)
+    driver, results = paginate_search(driver, known_urls)
+    return driver, results, hitcount
+
+def probe_hits(driver, fromdate, todate, query):
+    '''
+    Submits a search and returns its number of hits without fetching results,
+    or None if the query is not accepted or the hit count cannot be read.
+    '''
+    if not _submit_search(driver, fromdate, todate, query):
+        return None
+    return get_hitcount(driver)
+
+def _submit_search(driver, fromdate, todate, query):
+    ''' submits the search form, returns False if the query is not accepted '''
     driver = _focus_search_main(driver)
     _go_set_query(driver, fromdate, todate, query)
     driver.find_element_by_xpath('//*[@type="submit"]').click()
-    if "none of your terms are searchable words" in driver.page_source:
-        raise Exception("Search terms not accepted :-(")
-    driver, results = paginate_search(driver)
-    return driver, results
+    return "none of your terms are searchable words" not in driver.page_source
+
+def get_hitcount(driver):
+    '''
+    Reads the number of hits, shown as e.g. "(1,234)", from the results page.
+    Returns None if there is no readable count.
+    '''
+    driver = _focus_search_main(driver)
+    count  = retry(10, driver.find_element, 'id', 'updateCountDiv')
+    match  = count not in ("FAILED", None) and re.search(r'\d[\d.,]*', count.text)
+    if not match:
+        logger.warning("Could not read the number of hits")
+        return None
+    return int(re.sub(r'[.,]', '', match.group()))
 
 def _focus_search_main(driver):
     logger.debug("Resetting driver page position")
@@ -235,11 +550,11 @@ def _go_set_query(driver, fromdate, todate, query):
     retry(6, setdate)
     time.sleep(2)
     makestring  = lambda x: "%02d/%02d/%s" %(x.day, x.month, x.year)
-    driver.find_element('id','fromDate1').send_keys(makestring(fromdate ))
-    driver.find_element('id','toDate1'  ).send_keys(makestring(todate   ))
-    driver.find_element('id','terms'    ).send_keys(query)
+    for field, value in [('fromDate1', makestring(fromdate)), ('toDate1', makestring(todate)), ('terms', query)]:
+        driver.find_element('id',field).clear()
+        driver.find_element('id',field).send_keys(value)
 
-def paginate_search(driver):
+def paginate_search(driver, known_urls=()):
 
     all_results = []
     nextpage = True
@@ -247,7 +562,7 @@ def paginate_search(driver):
     driver = _focus_search_main(driver)
 
     while nextpage:
-        driver, results = retry(10, get_results,driver)
+        driver, results = retry(10, get_results,driver, known_urls)
         all_results.extend(results)
         
         try:    nextpage = retry(3,driver.find_element_by_xpath,'//a[@class="icon la-TriangleRight "]')
@@ -260,15 +575,13 @@ def paginate_search(driver):
 
     return driver, all_results        
 
-def get_results(driver):
+def get_results(driver, known_urls=()):
+    '''
+    Parses the results on the current results page. Results whose url is in
+    known_urls are not opened and only hold what the results page lists.
+    '''
     driver         = _focus_search_main(driver)
 
-    def ga(byline):
-        if "\n" in byline: 
-            return byline.split("\n")
-        else:
-            return byline, ""
-
     retry(10, driver.find_element_by_xpath, '//ol[@class="nexisresult"]//h2/a')
     
     # Result properties
@@ -278,18 +591,13 @@ def get_results(driver):
     result_dates   = [ ref.text for ref in driver.find_elements_by_xpath('//li[@class="pubdate"]')]
     result_nhits   = [ ref.text for ref in driver.find_elements_by_xpath('//p[@class="hitsinfo"]')]
 
-    results = [dict(url        = url, 
-                    source     = source, 
-                    byline     = byline, 
-                    firstline  = ga(byline)[0], 
-                    secondline = ga(byline)[1], 
-                    date       = date, 
-                    hits       = nhits ) for 
+    results = [records.Article(url, source, byline, date, nhits) for
                     url, source, byline, date, nhits in zip(result_urls, result_source, result_bylines, result_dates, result_nhits)
                 ]
     time.sleep(1)
     
     for n, result in enumerate(tqdm.tqdm(results,disable=not VERBOSE, desc="parsing results")):
+        if result['url'] in known_urls: continue
         driver, page_content = get_result(driver, n)
         result.update(page_content)
         driver = _focus_search_main(driver)
@@ -299,7 +607,7 @@ def get_results(driver):
             if refreshable == 10: break
             refreshable +=1
     time.sleep(1)
-    return driver, results 
+    return driver, results
 
 def get_result(driver, resultnumber):
     '''
@@ -318,7 +626,7 @@ def get_result(driver, resultnumber):
     # get content
     result = {}
     retry(10, driver.find_element, 'id','document')
-    result['raw']     = driver.page_source
+    result['raw']     = records.store_raw(RAWFILE, driver.page_source)
     result['excerpt'] = fon('//span[@class="SS_L0"]')
     result['body']    = '\n'.join([t.text for t in driver.find_elements_by_xpath('//p[@class="loose"]')])
 
@@ -481,6 +789,10 @@ def start_spagetti_code():
     parser.add_option('-c','--country', action='store', dest='country', help='Country to select sources or content from', default='All Countries')
     parser.add_option('-s','--sources', action='store', dest='sources', 
                         help='semi-colon seperated sources, e.g. "Die Welt; Der Spiegel"')
+    parser.add_option('-f','--queryfile', action='store', dest='queryfile', help='file containing the query, e.g. german_political_query.txt')
+    parser.add_option('-m','--max-hits', action='store', dest='max_hits', help='split OR-queries into shards of at most this many hits per day, e.g. %s' %MAX_HITS)
+    parser.add_option('-u','--refresh', action='store_true', dest='refresh', help='only fetch stored days whose hit counts changed')
+    parser.add_option('-j','--jobfile', action='store', dest='jobfile', help='JSON file listing (country, sources, query, date range) jobs, see load_jobs')
     parser.add_option('-r','--retries', action='store',      dest='retries', help='number of times to retry', default=1)
     parser.add_option('-d','--debug',   action='store_true', dest='debug',   help='set logging to debug')
     parser.add_option('-v','--verbose', action='store_true', dest='verbose', help='set logging to info')
@@ -497,7 +809,16 @@ def start_spagetti_code():
         logger.setLevel("WARN")
         VERBOSE = False
        
-    if not options.sources:
+    if options.jobfile:
+        jobs = load_jobs(options.jobfile)
+        for job in jobs:
+            print("{name}: {country}, {n} sources, {from} to {to}".format(n=len(job['sources']), **job))
+        progress = run_jobs(jobs)
+        for name, counts in progress.items():
+            print("{name}: {done} of {total} tasks done, {skipped} skipped with an existing result file, {n} failed".format(
+                name=name, n=len(counts['failed']), **counts))
+
+    elif not options.sources:
         print("No sources specified, printing available sources for '%s':" %options.country)
         driver = _make_driver()
         sources = retry(int(options.retries), main, driver, country=options.country)
@@ -507,16 +828,21 @@ def start_spagetti_code():
     else:
         sources = [s.strip() for s in options.sources.split(';')]
         query   = ' OR '.join(queryterms)
+        if options.queryfile:
+            query = open(options.queryfile).read().strip()
+        max_hits = options.max_hits and int(options.max_hits)
         
         # report settings to user
         print("Searching for:\n\t'{query}'\n".format(**locals()))
         print("List of sources to consult:")
         for source in sources:
             print("- '{source}'".format(**locals()))
-        if int(options.retries)==1:
-            search_back_by_day(country=options.country, sources=sources, query=' OR '.join(queryterms))
+        if options.refresh:
+            refresh_by_day(country=options.country, sources=sources, query=query, max_hits=max_hits or MAX_HITS)
+        elif int(options.retries)==1:
+            search_back_by_day(country=options.country, sources=sources, query=query, max_hits=max_hits)
         else:
-            retry(int(options.retries), search_back_by_day, country=options.country, sources=sources, query=' OR '.join(queryterms))
+            retry(int(options.retries), search_back_by_day, country=options.country, sources=sources, query=query, max_hits=max_hits)
 
 if __name__ == '__main__':
     start_spagetti_code()
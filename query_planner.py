@@ -0,0 +1,257 @@
+"""
+
+Query planner for long OR-queries
+
+Lexis Nexis caps the number of results per search and rejects queries that grow
+too long ("none of your terms are searchable words"). The planner parses an
+OR-query (such as german_political_query.txt) into its terms, probes hit counts
+for sub-queries and splits the terms into shards that stay under the cap. After
+searching every shard, the results are merged, deduplicated on url and
+annotated with the terms that matched each article.
+
+Only queries whose top-level operator is OR can be split; the Lexis Nexis
+grammar in parse is shared with corpus_index.
+
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MATCH_FIELDS = ('byline', 'excerpt', 'body')
+
+def tokenize(query):
+    ''' splits a query into quoted phrases, parentheses and bare words '''
+    return re.findall(r'"[^"]*"|\(|\)|[^\s()"]+', query)
+
+OPERATORS = ('OR', 'AND', 'NOT', 'AND NOT')
+PHRASE    = 'PHRASE'
+
+def _operator(token):
+    upper = token.upper()
+    if upper in OPERATORS or re.match(r'(W|PRE)/\w+$', upper):
+        return upper
+    return None
+
+def is_proximity(operator):
+    return operator.startswith('W/') or operator.startswith('PRE/')
+
+def lex(query):
+    '''
+    Tokenizes a query into operators, parentheses and (PHRASE, word) tuples. A
+    bare NOT becomes AND NOT, as in Lexis Nexis.
+    '''
+    tokens = []
+    for token in tokenize(query):
+        operator = token not in ('(', ')') and _operator(token)
+        if operator == 'NOT' and tokens and tokens[-1] == 'AND':
+            tokens[-1] = 'AND NOT'
+        elif operator == 'NOT':
+            tokens.append('AND NOT')
+        elif operator or token in ('(', ')'):
+            tokens.append(operator or token)
+        else:
+            tokens.append((PHRASE, token))
+    return tokens
+
+def parse(query):
+    '''
+    Parses a Lexis Nexis query into a tree of (operator, operands) nodes, with
+    (PHRASE, words) leaves. As in Lexis Nexis, OR binds tighter than the
+    proximity operators (w/n, pre/n), which bind tighter than AND, which binds
+    tighter than AND NOT, and adjacent words without an operator form a phrase.
+    Raises ValueError for queries that cannot be parsed.
+    '''
+    tokens = lex(query)
+    pos    = [0]
+    if not tokens:
+        raise ValueError("empty query")
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def take():
+        token  = peek()
+        pos[0] += 1
+        return token
+
+    def binary(accepts, operand):
+        nodes, operators = [operand()], []
+        while isinstance(peek(), str) and accepts(peek()):
+            operators.append(take())
+            nodes.append(operand())
+        if not operators:
+            return nodes[0]
+        if len(set(operators)) == 1:
+            return (operators[0], nodes)
+        # mixed proximity operators, e.g. a w/5 b pre/3 c, group from the left
+        node = nodes[0]
+        for operator, right in zip(operators, nodes[1:]):
+            node = (operator, [node, right])
+        return node
+
+    def atom():
+        token = take()
+        if token == '(':
+            node = andnot()
+            if take() != ')':
+                raise ValueError("missing closing parenthesis")
+            return node
+        if token is None:
+            raise ValueError("query ends with an operator")
+        if isinstance(token, str):
+            raise ValueError("unexpected operator {}".format(token))
+        words = [token[1]]
+        while isinstance(peek(), tuple):
+            words.append(take()[1])
+        return (PHRASE, words)
+
+    def or_():    return binary(lambda t: t == 'OR', atom)
+    def prox():   return binary(is_proximity, or_)
+    def and_():   return binary(lambda t: t == 'AND', prox)
+    def andnot(): return binary(lambda t: t == 'AND NOT', and_)
+
+    node = andnot()
+    if peek() is not None:
+        raise ValueError("unexpected {}".format(peek()))
+    return node
+
+def to_query(node):
+    ''' renders a parsed query in Lexis Nexis syntax again '''
+    operator, operands = node
+    if operator == PHRASE:
+        return ' '.join(operands)
+    return ' {} '.format(operator).join(_group(operand) for operand in operands)
+
+def _group(node):
+    return to_query(node) if node[0] == PHRASE else '({})'.format(to_query(node))
+
+def parse_query(query):
+    '''
+    Splits a boolean query into the operands of its top-level OR, so
+    '"CDU" OR ("SPD" AND "Schulz")' gives ['"CDU"', '("SPD" AND "Schulz")'].
+    A query with any other top-level operator cannot be split into shards and
+    is returned as a single term: OR binds tighter than AND, so
+    '"CDU" OR "SPD" AND "Merkel"' gives ['("CDU" OR "SPD") AND "Merkel"'].
+    Raises ValueError for queries that cannot be parsed.
+    '''
+    tree = parse(query)
+    if tree[0] != 'OR':
+        return [to_query(tree)]
+    return [_group(operand) for operand in tree[1]]
+
+def join_terms(terms):
+    return ' OR '.join(terms)
+
+def plan_shards(terms, probe, max_hits):
+    '''
+    Splits terms into shards whose OR-query stays under max_hits.
+
+    probe is called with a query string and returns its hit count, or None when
+    Lexis Nexis does not accept the query or the count is unknown. Shards over
+    the cap, or with an unknown count, are halved until they fit; a single term
+    over the cap is kept (with a warning) and a single term without a count is
+    dropped. Adjacent shards are merged again when their summed hits, an upper
+    bound for the OR of both, fit the cap and probing the merged query confirms
+    that it is accepted and under the cap. Merges longer than a query that was
+    not accepted are not probed, unless that query held a dropped term.
+
+    Returns a list of (terms, hits) tuples.
+    '''
+    shards   = []
+    pending  = [list(terms)]
+    rejected = []
+    dropped  = set()
+    while pending:
+        shard = pending.pop(0)
+        query = join_terms(shard)
+        hits  = probe(query)
+        logger.info("probed {hits} hits for {query}".format(**locals()))
+        if hits is not None and hits <= max_hits:
+            shards.append((shard, hits))
+        elif len(shard) == 1 and hits is None:
+            logger.warning("Search term {query} not accepted or without hit count, dropping it".format(**locals()))
+            dropped.add(shard[0])
+        elif len(shard) == 1:
+            logger.warning("Search term {query} has {hits} hits, over the cap of {max_hits}".format(**locals()))
+            shards.append((shard, hits))
+        else:
+            if hits is None: rejected.append(shard)
+            half = len(shard) // 2
+            pending[0:0] = [shard[:half], shard[half:]]
+
+    # a query holding a dropped term was rejected for that term, not its length
+    cutoff = min([len(join_terms(shard)) for shard in rejected if not dropped.intersection(shard)] or [float('inf')])
+    merged = []
+    for shard, hits in shards:
+        if merged and merged[-1][1] + hits <= max_hits:
+            candidate = merged[-1][0] + shard
+            query     = join_terms(candidate)
+            if len(query) < cutoff:
+                candidate_hits = probe(query)
+                if candidate_hits is not None and candidate_hits <= max_hits:
+                    merged[-1] = (candidate, candidate_hits)
+                    continue
+                if candidate_hits is None:
+                    cutoff = len(query)
+        merged.append((shard, hits))
+    return merged
+
+def _pattern(words):
+    ''' regex for a phrase on word boundaries, a trailing ! or * truncates its last word '''
+    phrase = ' '.join(w.strip('"') for w in words)
+    prefix = phrase.endswith('!') or phrase.endswith('*')
+    words  = phrase.rstrip('!*').split()
+    if not words: return None
+    return r'(?<!\w){}{}'.format(r'\s+'.join(re.escape(w) for w in words), r'\w*' if prefix else r'(?!\w)')
+
+def _matches(node, text):
+    operator, operands = node
+    if operator == PHRASE:
+        pattern = _pattern(operands)
+        return bool(pattern and re.search(pattern, text, re.IGNORECASE))
+    if operator == 'OR':
+        return any(_matches(operand, text) for operand in operands)
+    if operator == 'AND NOT':
+        return _matches(operands[0], text) and not any(_matches(operand, text) for operand in operands[1:])
+    return all(_matches(operand, text) for operand in operands)
+
+def term_matches(term, text):
+    '''
+    Checks whether term occurs in text, case insensitive and on word
+    boundaries. Compound terms are evaluated as boolean queries, e.g.
+    '("SPD" AND NOT "Schulz")' matches when SPD occurs and Schulz does not.
+    Proximity operators are checked as AND.
+    '''
+    try:
+        return _matches(parse(term), text)
+    except ValueError:
+        return False
+
+def matched_terms(result, terms):
+    ''' returns the terms that occur in the text fields of a result '''
+    text = '\n'.join(result.get(field) or '' for field in MATCH_FIELDS)
+    return [term for term in terms if term_matches(term, text)]
+
+def merge_shard_results(shard_results):
+    '''
+    Merges the results of several shard searches, given as (terms, results)
+    tuples. Articles are deduplicated on url; each article records the shard
+    queries it was returned for and the terms that matched its text. The first
+    result for every url is kept and annotated in place; later results for
+    the same url may be listed only (see get_results), so terms are matched
+    against the first.
+    '''
+    merged = {}
+    for terms, results in shard_results:
+        query = join_terms(terms)
+        for result in results:
+            if result['url'] not in merged:
+                result['shards'], result['matched_terms'] = [], []
+                merged[result['url']] = result
+            article = merged[result['url']]
+            article['shards'].append(query)
+            for term in matched_terms(article, terms):
+                if term not in article['matched_terms']:
+                    article['matched_terms'].append(term)
+    return list(merged.values())
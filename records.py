@@ -0,0 +1,156 @@
+"""
+
+Compact article records
+
+Article replaces the plain result dicts of get_results/get_result. It keeps its
+fields in __slots__, interns the strings that repeat across the corpus (source,
+date and caps keys), derives firstline and secondline from the byline instead
+of storing them, and keeps the raw page as a RawHandle into an append-only raw
+file that is only read when the raw page is asked for. RawHandles hold the path
+of the raw file relative to the data directory, so the data directory can be
+copied or moved as a whole.
+
+Articles still behave like the old dicts (result['url'], result.get('raw'),
+result.keys(), result.update(...)), so pickles with dicts and with Articles can
+be mixed.
+
+"""
+import os
+import sys
+import zlib
+
+FIELDS = ('url', 'source', 'byline', 'firstline', 'secondline', 'date', 'hits', 'excerpt', 'body')
+OPTIONAL_FIELDS = ('raw', 'matched_terms', 'shards')
+INTERNED_FIELDS = ('source', 'date')
+DATA_DIR = 'data'
+
+class RawHandle(object):
+    ''' location of a zlib compressed raw page in a raw file, by path relative to the data directory '''
+    __slots__ = ('path', 'offset', 'length')
+
+    def __init__(self, path, offset, length):
+        self.path   = path
+        self.offset = offset
+        self.length = length
+
+    def load(self, data_dir=DATA_DIR):
+        with open(os.path.join(data_dir, self.path), 'rb') as rawfile:
+            return self.read(rawfile)
+
+    def read(self, rawfile):
+        rawfile.seek(self.offset)
+        return zlib.decompress(rawfile.read(self.length)).decode('utf-8')
+
+    def __repr__(self):
+        return "RawHandle({path!r}, {offset}, {length})".format(path=self.path, offset=self.offset, length=self.length)
+
+def store_raw(path, raw, data_dir=DATA_DIR):
+    ''' appends a raw page to the raw file at path, inside data_dir, and returns its handle '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = zlib.compress(raw.encode('utf-8'))
+    with open(path, 'ab') as rawfile:
+        offset = rawfile.seek(0, os.SEEK_END)
+        rawfile.write(data)
+    return RawHandle(os.path.relpath(path, data_dir), offset, len(data))
+
+def load_raws(values, data_dir=DATA_DIR):
+    '''
+    Resolves a list of raw values (RawHandles, strings or None) to strings,
+    opening every raw file in data_dir only once and reading it front to back.
+    '''
+    pages   = list(values)
+    by_path = {}
+    for n, value in enumerate(pages):
+        if isinstance(value, RawHandle):
+            by_path.setdefault(value.path, []).append(n)
+    for path, positions in by_path.items():
+        with open(os.path.join(data_dir, path), 'rb') as rawfile:
+            for n in sorted(positions, key=lambda n: pages[n].offset):
+                pages[n] = pages[n].read(rawfile)
+    return pages
+
+class Article(object):
+    '''
+    A single search result. Any other key, such as the caps fields parsed by
+    _get_caps (e.g. 'PUBLICATION-TYPE:'), is kept in caps. result['raw'] reads
+    the raw page from DATA_DIR, use load_raws to read it from elsewhere.
+    '''
+    __slots__ = ('url', 'source', 'byline', 'date', 'hits', 'excerpt', 'body', 'caps', 'raw', 'matched_terms', 'shards')
+
+    def __init__(self, url, source, byline, date, hits):
+        self.url           = url
+        self.source        = sys.intern(source)
+        self.byline        = byline
+        self.date          = sys.intern(date)
+        self.hits          = hits
+        self.excerpt       = ''
+        self.body          = ''
+        self.caps          = {}
+        self.raw           = None
+        self.matched_terms = None
+        self.shards        = None
+
+    @property
+    def firstline(self):
+        return self.byline.split("\n")[0]
+
+    @property
+    def secondline(self):
+        lines = self.byline.split("\n")
+        return lines[1] if len(lines) > 1 else ""
+
+    def keys(self):
+        keys = list(FIELDS)
+        keys.extend(k for k in OPTIONAL_FIELDS if getattr(self, k) is not None)
+        keys.extend(self.caps)
+        return keys
+
+    def __getitem__(self, key):
+        if key == 'raw':
+            return self.raw.load() if isinstance(self.raw, RawHandle) else self.raw
+        if key in FIELDS or key in OPTIONAL_FIELDS:
+            return getattr(self, key)
+        return self.caps[key]
+
+    def __setitem__(self, key, value):
+        if key in ('firstline', 'secondline'):
+            return
+        if key in INTERNED_FIELDS:
+            setattr(self, key, sys.intern(value))
+        elif key in FIELDS or key in OPTIONAL_FIELDS:
+            setattr(self, key, value)
+        else:
+            self.caps[sys.intern(key)] = value
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, values):
+        for key, value in values.items():
+            self[key] = value
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        ''' unpickled strings are not interned, so intern them again '''
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        for key in INTERNED_FIELDS:
+            setattr(self, key, sys.intern(getattr(self, key)))
+        self.caps = {sys.intern(k): v for k, v in self.caps.items()}
+
+    def __repr__(self):
+        return "Article({url!r}, {source!r}, {date!r})".format(url=self.url, source=self.source, date=self.date)
@@ -0,0 +1,79 @@
+import os
+import pickle
+import pytest
+import corpus_export
+import records
+
+def _article(data, url, body):
+    article = records.Article(url, 'Die Welt', 'Name\nSecond line', '1 May 2017', '1 hit')
+    article.update({'raw': records.store_raw(str(data.join('raw.dat')), '<html>{}</html>'.format(body), str(data)),
+                    'body': body, 'LOAD-DATE:': 'May 2, 2017'})
+    return article
+
+@pytest.fixture
+def data(tmpdir):
+    corpus_export.VERBOSE = False
+    data = tmpdir.mkdir('data')
+    pickle.dump([_article(data, 'u1', 'Die CDU tagt'), {'url': 'u2', 'source': 'Die Welt', 'raw': '<html>u2</html>'}],
+                open(str(data.join('Die Welt_2017-05-01.pkl')), 'wb'))
+    pickle.dump([_article(data, 'u3', 'Die SPD')], open(str(data.join('Die Welt_2017-06-01.pkl')), 'wb'))
+    pickle.dump([], open(str(data.join('Die Welt_2017-06-02.pkl')), 'wb'))
+    pickle.dump([_article(data, 'u4', 'Die AfD')], open(str(data.mkdir('job1').join('Die Welt_2017-05-01.pkl')), 'wb'))
+    return data
+
+def _export(data, tmpdir):
+    return corpus_export.export_corpus(str(data), str(tmpdir.join('export')))
+
+def _mtimes(tmpdir):
+    return {str(p): p.mtime() for p in tmpdir.join('export').visit('*.parquet')}
+
+def test_export_partitions_by_source_and_month(data, tmpdir):
+    assert _export(data, tmpdir) == 3
+    names = sorted(os.path.relpath(p, str(tmpdir.join('export'))) for p in _mtimes(tmpdir))
+    assert names == ['source=Die Welt/month=2017-05/part-2017-05-01.parquet',
+                     'source=Die Welt/month=2017-05/part-job1-2017-05-01.parquet',
+                     'source=Die Welt/month=2017-05/raw-2017-05-01.parquet',
+                     'source=Die Welt/month=2017-05/raw-job1-2017-05-01.parquet',
+                     'source=Die Welt/month=2017-06/part-2017-06-01.parquet',
+                     'source=Die Welt/month=2017-06/raw-2017-06-01.parquet']
+
+def test_second_export_writes_nothing(data, tmpdir):
+    _export(data, tmpdir)
+    mtimes = _mtimes(tmpdir)
+    assert _export(data, tmpdir) == 0
+    assert _mtimes(tmpdir) == mtimes
+
+def test_changed_pickle_rewrites_only_its_own_day(data, tmpdir):
+    _export(data, tmpdir)
+    before = _mtimes(tmpdir)
+    path   = data.join('Die Welt_2017-06-01.pkl')
+    pickle.dump(pickle.load(open(str(path), 'rb')) + [_article(data, 'u5', 'Die FDP')], open(str(path), 'wb'))
+    later  = max(before.values()) + 10
+    os.utime(str(path), (later, later))
+    assert _export(data, tmpdir) == 1
+    changed = sorted(os.path.basename(p) for p, mtime in _mtimes(tmpdir).items() if mtime != before[p])
+    assert changed == ['part-2017-06-01.parquet', 'raw-2017-06-01.parquet']
+    assert corpus_export.load_metadata(str(tmpdir.join('export')), months=['2017-06']).column('url').to_pylist() == ['u3', 'u5']
+
+def test_load_metadata_subsets_columns_and_stores_nulls(data, tmpdir):
+    _export(data, tmpdir)
+    table = corpus_export.load_metadata(str(tmpdir.join('export')), sources=['Die Welt'], months=['2017-05'],
+                                        columns=['url', 'body', 'caps'])
+    assert table.column_names == ['url', 'body', 'caps']
+    rows = table.to_pydict()
+    assert sorted(rows['url']) == ['u1', 'u2', 'u4']
+    assert rows['body'][rows['url'].index('u2')] is None
+    assert rows['caps'][rows['url'].index('u1')] == '{"LOAD-DATE:": "May 2, 2017"}'
+    assert corpus_export.load_metadata(str(tmpdir.join('export')), sources=['Der Spiegel']) is None
+
+def test_load_raw(data, tmpdir):
+    _export(data, tmpdir)
+    raw = corpus_export.load_raw(['u1', 'u2', 'u4', 'unknown'], str(tmpdir.join('export')))
+    assert raw == {'u1': '<html>Die CDU tagt</html>', 'u2': '<html>u2</html>', 'u4': '<html>Die AfD</html>'}
+
+def test_export_of_a_moved_data_directory(data, tmpdir):
+    data.move(tmpdir.join('copy'))
+    with tmpdir.mkdir('elsewhere').as_cwd():
+        assert _export(tmpdir.join('copy'), tmpdir) == 3
+    raw = corpus_export.load_raw(['u1', 'u4'], str(tmpdir.join('export')))
+    assert raw == {'u1': '<html>Die CDU tagt</html>', 'u4': '<html>Die AfD</html>'}
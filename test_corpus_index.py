@@ -0,0 +1,61 @@
+import pickle
+import pytest
+import corpus_index
+
+@pytest.fixture
+def connection(tmpdir):
+    corpus_index.VERBOSE = False
+    data = tmpdir.mkdir('data')
+    pickle.dump([{'url': 'u1', 'source': 'Die Welt', 'body': 'Die CDU tagt'},
+                 {'url': 'u2', 'source': 'Die Welt', 'body': 'Die SPD und Angela Merkel'},
+                 {'url': 'u3', 'source': 'Die Welt', 'body': 'Merkel und die Grünen', 'LOAD-DATE:': 'Mai 2017'}],
+                open(str(data.join('Die Welt_2017-05-01.pkl')), 'wb'))
+    pickle.dump([{'url': 'u1', 'source': 'Die Welt', 'body': 'Die CDU tagt'}],
+                open(str(data.join('Die Welt_2017-05-02.pkl')), 'wb'))
+    connection = corpus_index.connect(str(tmpdir.join('index.sqlite')))
+    corpus_index.update_index(connection, str(data))
+    return connection
+
+def _urls(connection, query):
+    return sorted(url for url, _, _, _ in corpus_index.search(connection, query))
+
+def test_to_fts_or_binds_tighter_than_and():
+    assert corpus_index.to_fts('CDU OR SPD AND Merkel') == '(("CDU" OR "SPD") AND "Merkel")'
+    assert corpus_index.to_fts('CDU OR SPD AND merkel! AND NOT "Die PARTEI"') == \
+        '((("CDU" OR "SPD") AND "merkel" *) NOT "Die PARTEI")'
+
+def test_to_fts_adjacent_words_form_a_phrase():
+    assert corpus_index.to_fts('Angela Merkel OR "Martin Schulz"') == '("Angela Merkel" OR "Martin Schulz")'
+
+@pytest.mark.parametrize('query', ['NOT CDU', 'CDU AND', '(CDU OR SPD', 'CDU )'])
+def test_to_fts_rejects_malformed_queries(query):
+    with pytest.raises(ValueError):
+        corpus_index.to_fts(query)
+
+def test_index_skips_duplicate_urls(connection):
+    assert connection.execute('SELECT count(*) FROM articles').fetchone()[0] == 3
+    assert connection.execute('SELECT count(*) FROM urls').fetchone()[0] == 3
+
+def test_search_uses_lexis_nexis_precedence(connection):
+    assert _urls(connection, 'CDU OR SPD AND Merkel') == ['u2']
+    assert _urls(connection, 'CDU OR SPD') == ['u1', 'u2']
+    assert _urls(connection, 'Merkel AND NOT SPD') == ['u3']
+
+def test_search_caps_and_truncation(connection):
+    assert _urls(connection, '"Mai 2017"') == ['u3']
+    assert _urls(connection, 'Grün!') == ['u3']
+
+def test_update_reindexes_changed_pickles(connection, tmpdir):
+    path    = str(tmpdir.join('data', 'Die Welt_2017-05-02.pkl'))
+    results = pickle.load(open(path, 'rb'))
+    pickle.dump(results + [{'url': 'u4', 'source': 'Die Welt', 'body': 'Neu: die FDP'}], open(path, 'wb'))
+    assert corpus_index.update_index(connection, str(tmpdir.join('data'))) == 1
+    assert _urls(connection, 'FDP') == ['u4']
+    assert corpus_index.update_index(connection, str(tmpdir.join('data'))) == 0
+
+def test_update_indexes_job_directories(connection, tmpdir):
+    job = tmpdir.join('data').mkdir('job1')
+    pickle.dump([{'url': 'u5', 'source': 'Die Welt', 'body': 'Die AfD'}], open(str(job.join('Die Welt_2017-05-01.pkl')), 'wb'))
+    assert corpus_index.update_index(connection, str(tmpdir.join('data'))) == 1
+    paths = {row[0] for row in connection.execute('SELECT path FROM indexed_pickles')}
+    assert paths == {'Die Welt_2017-05-01.pkl', 'Die Welt_2017-05-02.pkl', 'job1/Die Welt_2017-05-01.pkl'}
@@ -0,0 +1,40 @@
+import datetime
+import json
+import ln_scraper
+
+def _job(name, country, sources, fromdate, todate, query='"CDU"'):
+    return dict(name=name, country=country, sources=sources, query=query, max_hits=None,
+                fromdate=datetime.datetime(*fromdate), todate=datetime.datetime(*todate))
+
+def test_load_jobs_reads_queryfile_and_dates(tmpdir):
+    queryfile = tmpdir.join('query.txt')
+    queryfile.write('"CDU" OR "SPD"\n')
+    jobfile = tmpdir.join('jobs.json')
+    jobfile.write(json.dumps([
+        {"country": "Germany", "sources": ["Die Welt"], "queryfile": str(queryfile), "from": "2017-01-01", "to": "2017-02-01"},
+        {"name": "spiegel", "country": "Germany", "sources": ["Der Spiegel"], "query": "\"AfD\"", "max_hits": 3000,
+         "from": "2017-03-01", "to": "2017-03-02"}]))
+    first, second = ln_scraper.load_jobs(str(jobfile))
+    assert first['name'] == 'job0'
+    assert first['query'] == '"CDU" OR "SPD"'
+    assert first['max_hits'] is None
+    assert first['fromdate'] == datetime.datetime(2017, 1, 1)
+    assert first['todate'] == datetime.datetime(2017, 2, 1)
+    assert second['name'] == 'spiegel'
+    assert second['query'] == '"AfD"'
+    assert second['max_hits'] == 3000
+
+def test_schedule_tasks_orders_by_country_source_page_source_and_newest_day():
+    jobs  = [_job('welt', 'Germany', ['taz, die tageszeitung', 'Die Welt'], (2017, 1, 1), (2017, 1, 3)),
+             _job('spiegel', 'Germany', ['Der Spiegel', '20 Minuten'], (2017, 1, 2), (2017, 1, 3)),
+             _job('standard', 'Austria', ['Der Standard'], (2017, 1, 1), (2017, 1, 2))]
+    tasks = ln_scraper.schedule_tasks(jobs)
+    assert [(t['country'], t['source'], t['todate'].day) for t in tasks] == [
+        ('Austria', 'Der Standard', 2),
+        ('Germany', '20 Minuten', 3),
+        ('Germany', 'Der Spiegel', 3),
+        ('Germany', 'Die Welt', 3),
+        ('Germany', 'Die Welt', 2),
+        ('Germany', 'taz, die tageszeitung', 3),
+        ('Germany', 'taz, die tageszeitung', 2)]
+    assert [t['job'] for t in tasks[:3]] == ['standard', 'spiegel', 'spiegel']
@@ -0,0 +1,103 @@
+import query_planner
+
+def test_parse_query_splits_top_level_or():
+    query = '"CDU" OR ("SPD" OR "Schulz") OR "Angela Merkel"'
+    assert query_planner.parse_query(query) == ['"CDU"', '("SPD" OR "Schulz")', '"Angela Merkel"']
+
+def test_parse_query_only_splits_when_or_is_the_top_level_operator():
+    assert query_planner.parse_query('"CDU" OR "SPD" AND "Merkel"') == ['("CDU" OR "SPD") AND "Merkel"']
+    assert query_planner.parse_query('"CDU" OR "SPD" AND NOT "Merkel"') == ['("CDU" OR "SPD") AND NOT "Merkel"']
+    assert query_planner.parse_query('"CDU" OR "SPD" w/5 "Merkel"') == ['("CDU" OR "SPD") W/5 "Merkel"']
+    assert query_planner.parse_query('"CDU" OR ("SPD" AND "Merkel")') == ['"CDU"', '("SPD" AND "Merkel")']
+
+def test_parse_query_terms_keep_their_meaning_when_joined():
+    terms = query_planner.parse_query('"CDU" OR ("SPD" AND NOT "Schulz") OR Angela Merkel')
+    assert query_planner.parse(query_planner.join_terms(terms)) == \
+        ('OR', [('PHRASE', ['"CDU"']), ('AND NOT', [('PHRASE', ['"SPD"']), ('PHRASE', ['"Schulz"'])]),
+                ('PHRASE', ['Angela', 'Merkel'])])
+
+def test_parse_query_political_query():
+    terms = query_planner.parse_query(open('german_political_query.txt').read())
+    assert len(terms) == 31
+    assert terms[0] == '"CDU"'
+    assert terms[-1] == '"Martin Sonneborn"'
+
+def _probe_with(hits_per_term, max_length=None, log=None):
+    def probe(query):
+        if log is not None: log.append(query)
+        if max_length and len(query) > max_length:
+            return None
+        return sum(hits_per_term[t] for t in query_planner.parse_query(query))
+    return probe
+
+def test_plan_shards_stays_under_cap():
+    terms  = ['"a"', '"b"', '"c"', '"d"']
+    hits   = {'"a"': 400, '"b"': 700, '"c"': 200, '"d"': 100}
+    shards = query_planner.plan_shards(terms, _probe_with(hits), 1000)
+    assert [t for shard, _ in shards for t in shard] == terms
+    assert all(h <= 1000 for _, h in shards)
+
+def test_plan_shards_keeps_single_term_over_cap():
+    shards = query_planner.plan_shards(['"a"', '"b"'], _probe_with({'"a"': 5000, '"b"': 10}), 1000)
+    assert shards == [(['"a"'], 5000), (['"b"'], 10)]
+
+def test_plan_shards_drops_rejected_single_term():
+    def probe(query):
+        return None if '"bad"' in query else 1
+    assert query_planner.plan_shards(['"ok"', '"bad"'], probe, 1000) == [(['"ok"'], 1)]
+
+def test_plan_shards_dropped_term_does_not_limit_merges():
+    terms = ['"a"', '"b"', '"c"', '"d"', '"e"', '"f"', '"g"', '"bad"']
+    def probe(query):
+        if '"bad"' in query: return None
+        return 10 * len(query_planner.parse_query(query))
+    assert query_planner.plan_shards(terms, probe, 1000) == [(terms[:-1], 70)]
+
+def test_plan_shards_does_not_probe_merges_longer_than_rejected():
+    terms = ['"a"', '"b"', '"c"', '"d"']
+    log   = []
+    probe = _probe_with(dict.fromkeys(terms, 10), max_length=len('"a" OR "b" OR "c"'), log=log)
+    shards = query_planner.plan_shards(terms, probe, 1000)
+    assert shards == [(['"a"', '"b"'], 20), (['"c"', '"d"'], 20)]
+    assert log.count(query_planner.join_terms(terms)) == 1
+
+def test_plan_shards_merge_uses_probed_count():
+    counts = {'"a" OR "b" OR "c"': [2000, 150], '"a"': [100], '"b" OR "c"': [100]}
+    shards = query_planner.plan_shards(['"a"', '"b"', '"c"'], lambda q: counts[q].pop(0), 1000)
+    assert shards == [(['"a"', '"b"', '"c"'], 150)]
+
+def test_plan_shards_rejected_merge_keeps_parts():
+    terms = ['"a"', '"b"']
+    def probe(query):
+        if query == '"a" OR "b"': return 5000
+        return 10
+    shards = query_planner.plan_shards(terms, probe, 1000)
+    assert shards == [(['"a"'], 10), (['"b"'], 10)]
+
+def test_merge_shard_results_dedupes_and_records_terms():
+    first  = [{'url': 'u1', 'body': 'Die CDU und die SPD'}]
+    second = [{'url': 'u1', 'body': 'Die CDU und die SPD'}, {'url': 'u2', 'body': 'Die Linke'}]
+    merged = query_planner.merge_shard_results([(['"CDU"'], first), (['"SPD"', '"LINKE"'], second)])
+    assert [r['url'] for r in merged] == ['u1', 'u2']
+    assert merged[0]['shards'] == ['"CDU"', '"SPD" OR "LINKE"']
+    assert merged[0]['matched_terms'] == ['"CDU"', '"SPD"']
+    assert merged[1]['matched_terms'] == ['"LINKE"']
+
+def test_merge_shard_results_matches_terms_on_the_opened_result():
+    opened = [{'url': 'u1', 'body': 'Die CDU und die SPD'}]
+    listed = [{'url': 'u1', 'body': ''}]
+    merged = query_planner.merge_shard_results([(['"CDU"'], opened), (['"SPD"'], listed)])
+    assert merged[0]['shards'] == ['"CDU"', '"SPD"']
+    assert merged[0]['matched_terms'] == ['"CDU"', '"SPD"']
+
+def test_term_matches_word_boundaries():
+    assert query_planner.term_matches('"SPD"', 'die SPD-Fraktion')
+    assert not query_planner.term_matches('"AfD"', 'Kafdrucker')
+    assert query_planner.term_matches('("SPD" AND "Schulz")', 'Martin Schulz, SPD')
+
+def test_term_matches_not_and_truncation():
+    assert query_planner.term_matches('("SPD" AND NOT "Schulz")', 'SPD allein')
+    assert not query_planner.term_matches('("SPD" AND NOT "Schulz")', 'SPD und Schulz')
+    assert query_planner.term_matches('Grün!', 'die Grünen')
+    assert query_planner.term_matches('"Angela Merk*"', 'Angela  Merkel')
+    assert not query_planner.term_matches('Grün', 'die Grünen')
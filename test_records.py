@@ -0,0 +1,52 @@
+import pickle
+import sys
+import query_planner
+import records
+
+def _article(tmpdir, url='u1', raw='<html>Die CDU</html>'):
+    article = records.Article(url, 'Die ' + 'Welt', 'Name\nSecond line', '1 May 2017', '3 hits')
+    article.update({'raw': records.store_raw(str(tmpdir.join('data', 'raw.dat')), raw, str(tmpdir.join('data'))),
+                    'excerpt': 'e', 'body': 'Die CDU tagt', 'LOAD-DATE:': 'May 2, 2017'})
+    return article
+
+def test_article_behaves_like_a_result_dict(tmpdir):
+    article = _article(tmpdir)
+    assert article['firstline'] == 'Name'
+    assert article['secondline'] == 'Second line'
+    assert article['LOAD-DATE:'] == 'May 2, 2017'
+    assert article.get('shards', []) == []
+    assert 'raw' in article and 'shards' not in article
+    assert [k for k in article.keys() if k.endswith(':')] == ['LOAD-DATE:']
+    with tmpdir.as_cwd():
+        assert article['raw'] == '<html>Die CDU</html>'
+
+def test_article_keeps_raw_as_handle(tmpdir):
+    article = _article(tmpdir)
+    assert isinstance(article.raw, records.RawHandle)
+    assert article.raw.path == 'raw.dat'
+
+def test_raw_loads_from_a_moved_data_directory(tmpdir):
+    pickle.dump([_article(tmpdir)], open(str(tmpdir.join('data', 'results.pkl')), 'wb'))
+    tmpdir.join('data').move(tmpdir.join('copy'))
+    with tmpdir.mkdir('elsewhere').as_cwd():
+        article = pickle.load(open(str(tmpdir.join('copy', 'results.pkl')), 'rb'))[0]
+        assert records.load_raws([article.raw], str(tmpdir.join('copy'))) == ['<html>Die CDU</html>']
+        assert article.raw.load(str(tmpdir.join('copy'))) == '<html>Die CDU</html>'
+
+def test_pickled_article_is_interned(tmpdir):
+    article = pickle.loads(pickle.dumps(_article(tmpdir)))
+    assert article.source is sys.intern('Die Welt')
+    assert article.date is sys.intern('1 May 2017')
+    assert article.caps == {'LOAD-DATE:': 'May 2, 2017'}
+    assert article.body == 'Die CDU tagt'
+
+def test_load_raws_mixes_handles_and_strings(tmpdir):
+    first, second = _article(tmpdir, 'u1', 'one'), _article(tmpdir, 'u2', 'two')
+    assert records.load_raws([second.raw, 'inline', None, first.raw], str(tmpdir.join('data'))) == ['two', 'inline', None, 'one']
+
+def test_merge_shard_results_with_articles(tmpdir):
+    first, again = _article(tmpdir), _article(tmpdir)
+    merged = query_planner.merge_shard_results([(['"CDU"'], [first]), (['"SPD"', '"CDU"'], [again])])
+    assert merged == [first]
+    assert first['shards'] == ['"CDU"', '"SPD" OR "CDU"']
+    assert first['matched_terms'] == ['"CDU"']